@@ -15,11 +15,22 @@ This script covers the absolute basics of Pandas:
 import pandas as pd
 import numpy as np
 import os
+import sys
 import json
 
+# Shared helpers live in scripts/
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+)
+from profiling import StageProfiler  # noqa: E402
+from report_writer import write_report  # noqa: E402
+
 # Ensure 'outputs' directory exists
 os.makedirs("outputs", exist_ok=True)
 
+# Records time, memory, rows and bytes for each numbered section
+profiler = StageProfiler("01_quickstart_basic.py")
+
 print("Pandas version:", pd.__version__)
 print("Numpy version:", np.__version__)
 
@@ -27,70 +38,91 @@ print("Numpy version:", np.__version__)
 # 1. Load Data
 # -------------------------------------------------
 # Explicitly set customer_id to nullable Int64 (Pandas 2.x feature)
-sales_df = pd.read_csv(
-    "data/sales_small.csv",
-    dtype={"customer_id": "Int64"}
-)
+with profiler.stage("1. Load Data") as stage:
+    sales_df = pd.read_csv(
+        "data/sales_small.csv",
+        dtype={"customer_id": "Int64"}
+    )
+    stage.read("data/sales_small.csv")
+    stage.rows_out = len(sales_df)
 
 print("Data loaded successfully.")
 
 # -------------------------------------------------
 # 2. Inspect Data
 # -------------------------------------------------
-print("\n--- DataFrame Head ---")
-print(sales_df.head())
+with profiler.stage("2. Inspect Data") as stage:
+    stage.rows_in = len(sales_df)
+
+    print("\n--- DataFrame Head ---")
+    print(sales_df.head())
 
-print("\n--- DataFrame Info ---")
-sales_df.info()
+    print("\n--- DataFrame Info ---")
+    sales_df.info()
 
-print("\n--- DataFrame dtypes ---")
-print(sales_df.dtypes)
+    print("\n--- DataFrame dtypes ---")
+    print(sales_df.dtypes)
 
 # -------------------------------------------------
 # 3. Select Columns
 # -------------------------------------------------
-print("\nSingle column 'amount':")
-print(sales_df["amount"].head())
+with profiler.stage("3. Select Columns") as stage:
+    stage.rows_in = len(sales_df)
 
-print("\nMultiple columns 'order_id', 'amount', 'region':")
-print(sales_df[["order_id", "amount", "region"]].head())
+    print("\nSingle column 'amount':")
+    print(sales_df["amount"].head())
+
+    print("\nMultiple columns 'order_id', 'amount', 'region':")
+    print(sales_df[["order_id", "amount", "region"]].head())
 
 # -------------------------------------------------
 # 4. Row Selection with .loc and .iloc
 # -------------------------------------------------
-print("\nFirst 3 rows (labels 0 to 2 inclusive) using .loc:")
-print(sales_df.loc[0:2])
+with profiler.stage("4. Row Selection with .loc and .iloc") as stage:
+    stage.rows_in = len(sales_df)
+
+    print("\nFirst 3 rows (labels 0 to 2 inclusive) using .loc:")
+    print(sales_df.loc[0:2])
 
-print("\nRows at index positions 0, 2, 4 using .iloc:")
-print(sales_df.iloc[[0, 2, 4]])
+    print("\nRows at index positions 0, 2, 4 using .iloc:")
+    print(sales_df.iloc[[0, 2, 4]])
 
-print("\nAmount and Region for first 3 rows using .loc:")
-print(sales_df.loc[0:2, ["amount", "region"]])
+    print("\nAmount and Region for first 3 rows using .loc:")
+    print(sales_df.loc[0:2, ["amount", "region"]])
 
-print("\nAmount and Region for first 3 rows using .iloc:")
-print(sales_df.iloc[0:3, [5, 6]])  # amount, region column positions
+    print("\nAmount and Region for first 3 rows using .iloc:")
+    print(sales_df.iloc[0:3, [5, 6]])  # amount, region column positions
 
 # -------------------------------------------------
 # 5. Conditional Filtering
 # -------------------------------------------------
-high_value_orders = sales_df[sales_df["amount"] > 100]
+with profiler.stage("5. Conditional Filtering") as stage:
+    stage.rows_in = len(sales_df)
+
+    high_value_orders = sales_df[sales_df["amount"] > 100]
 
-print("\nOrders with amount > 100 (first 5):")
-print(high_value_orders.head())
+    print("\nOrders with amount > 100 (first 5):")
+    print(high_value_orders.head())
 
-electronics_north_orders = sales_df[
-    (sales_df["category"] == "Electronics") &
-    (sales_df["region"] == "North")
-]
+    electronics_north_orders = sales_df[
+        (sales_df["category"] == "Electronics") &
+        (sales_df["region"] == "North")
+    ]
 
-print("\n'Electronics' orders in 'North' region (first 5):")
-print(electronics_north_orders.head())
+    print("\n'Electronics' orders in 'North' region (first 5):")
+    print(electronics_north_orders.head())
+
+    stage.rows_out = len(high_value_orders)
 
 # -------------------------------------------------
 # 6. Save Report to CSV
 # -------------------------------------------------
 output_csv = "outputs/quick_report.csv"
-high_value_orders.to_csv(output_csv, index=False)
+with profiler.stage("6. Save Report to CSV") as stage:
+    stage.rows_in = len(high_value_orders)
+    write_report(high_value_orders, output_csv)
+    stage.wrote(output_csv)
+    stage.rows_out = len(high_value_orders)
 
 print(f"Saved '{output_csv}'")
 
@@ -101,9 +133,15 @@ verification_data = {
     "script": "01_quickstart_basic.py",
     "sales_rows": len(sales_df),
     "high_value_rows": len(high_value_orders),
-    "quick_report_exists": os.path.exists(output_csv)
+    "quick_report_exists": os.path.exists(output_csv),
+    "profile": profiler.summary(),
 }
 
+trace_path = profiler.write_chrome_trace()
+if trace_path:
+    print(f"Saved '{trace_path}'")
+profiler.close()
+
 verification_path = "outputs/verification_01_quickstart_basic.json"
 with open(verification_path, "w") as f:
     json.dump(verification_data, f, indent=2)
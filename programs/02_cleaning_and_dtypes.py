@@ -8,128 +8,232 @@ Demonstrates:
 - Datetime conversion
 - Duplicate removal
 - Memory optimization with categorical dtypes
+- A single-pass, cached data profile that later steps reuse
 """
 
 import pandas as pd
 import numpy as np
 import os
+import sys
 import json
 
+# Shared helpers live in scripts/
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+)
+from data_profile import load_or_build_profile  # noqa: E402
+from profiling import StageProfiler  # noqa: E402
+from report_writer import write_report  # noqa: E402
+
+# Text columns become categories only up to this distinct/rows ratio;
+# beyond it the codes plus a near-full category table save little memory
+CATEGORY_MAX_DISTINCT_RATIO = 0.5
+
 # Ensure 'outputs' directory exists
 os.makedirs("outputs", exist_ok=True)
 
+# Records time, memory, rows and bytes for each numbered section
+profiler = StageProfiler("02_cleaning_and_dtypes.py")
+
 # -------------------------------------------------
 # Load data (nullable Int64 for customer_id)
 # -------------------------------------------------
-sales_df = pd.read_csv(
-    "data/sales_small.csv",
-    dtype={"customer_id": "Int64"}
-)
+with profiler.stage("Load Data") as stage:
+    sales_df = pd.read_csv(
+        "data/sales_small.csv",
+        dtype={"customer_id": "Int64"}
+    )
+
+    print("Original DataFrame Info:")
+    sales_df.info()
+    print("\nOriginal DataFrame Head:")
+    print(sales_df.head())
 
-print("Original DataFrame Info:")
-sales_df.info()
-print("\nOriginal DataFrame Head:")
-print(sales_df.head())
+    stage.read("data/sales_small.csv")
+    stage.rows_out = len(sales_df)
 
 # -------------------------------------------------
-# 1. Missing Value Detection
+# 1. Data Profile and Missing Value Detection
 # -------------------------------------------------
-print("\nMissing values per column:")
-print(sales_df.isna().sum())
+# One sweep computes nulls, distinct counts, min/max, memory and
+# duplicates; the cached artifact is reused until the source changes
+with profiler.stage("1. Data Profile and Missing Value Detection") as stage:
+    stage.rows_in = len(sales_df)
+
+    data_profile = load_or_build_profile("data/sales_small.csv", sales_df)
+    column_profile = pd.DataFrame(data_profile["columns"]).T
+    source = "cache" if data_profile["from_cache"] else "new scan"
+    print(f"\nData profile ({source}): '{data_profile['cache_path']}'")
+    print(column_profile[["null_count", "distinct_estimate", "min", "max"]])
+
+    null_counts = column_profile["null_count"].astype(int)
+    print("\nMissing values per column:")
+    print(null_counts)
 
-print("\nPercentage of missing values:")
-missing_pct = (sales_df.isna().sum() / len(sales_df) * 100).round(2)
-print(missing_pct.astype(str) + "%")
+    print("\nPercentage of missing values:")
+    missing_pct = (null_counts / data_profile["rows"] * 100).round(2)
+    print(missing_pct.astype(str) + "%")
+
+    print("\nDuplicate rows in raw data:", data_profile["duplicate_rows"])
+
+    if data_profile["from_cache"]:
+        stage.read(data_profile["cache_path"])
+    else:
+        stage.wrote(data_profile["cache_path"])
 
 # -------------------------------------------------
 # 2. Imputation and Dropping Missing Values
 # -------------------------------------------------
-median_amount = sales_df["amount"].median()
-print(f"\nMedian amount: {median_amount:.2f}")
+with profiler.stage("2. Imputation and Dropping Missing Values") as stage:
+    stage.rows_in = len(sales_df)
 
-sales_df["amount_filled"] = sales_df["amount"].fillna(median_amount)
+    # The profile's null counts decide which columns need imputing
+    if null_counts["amount"]:
+        median_amount = sales_df["amount"].median()
+        print(f"\nMedian amount: {median_amount:.2f}")
+        sales_df["amount_filled"] = sales_df["amount"].fillna(median_amount)
+    else:
+        print("\nNo missing 'amount' values; skipping median imputation")
+        sales_df["amount_filled"] = sales_df["amount"]
 
-# Drop rows with missing customer_id (key identifier)
-sales_df_cleaned_initial = sales_df.dropna(subset=["customer_id"]).copy()
+    # Drop rows with missing customer_id (key identifier)
+    if null_counts["customer_id"]:
+        sales_df_cleaned_initial = (
+            sales_df.dropna(subset=["customer_id"]).copy()
+        )
+    else:
+        sales_df_cleaned_initial = sales_df.copy()
 
-# Impute region with mode
-mode_region = sales_df_cleaned_initial["region"].mode()[0]
-sales_df_cleaned_initial["region_filled"] = (
-    sales_df_cleaned_initial["region"].fillna(mode_region)
-)
+    # Impute region with mode
+    if null_counts["region"]:
+        mode_region = sales_df_cleaned_initial["region"].mode()[0]
+        sales_df_cleaned_initial["region_filled"] = (
+            sales_df_cleaned_initial["region"].fillna(mode_region)
+        )
+    else:
+        print("No missing 'region' values; skipping mode imputation")
+        sales_df_cleaned_initial["region_filled"] = (
+            sales_df_cleaned_initial["region"]
+        )
 
-print("\nMissing values after imputation and dropping:")
-print(sales_df_cleaned_initial.isna().sum())
+    print("\nMissing values after imputation and dropping:")
+    print(sales_df_cleaned_initial.isna().sum())
 
-print("\nDataFrame head after initial cleaning:")
-print(sales_df_cleaned_initial.head())
+    print("\nDataFrame head after initial cleaning:")
+    print(sales_df_cleaned_initial.head())
+
+    stage.rows_out = len(sales_df_cleaned_initial)
 
 # -------------------------------------------------
 # 3. Converting Data Types (Nullable dtypes)
 # -------------------------------------------------
-sales_df_cleaned_initial["customer_id"] = (
-    sales_df_cleaned_initial["customer_id"].astype("Int64")
-)
-print("\n'customer_id' dtype:")
-print(sales_df_cleaned_initial["customer_id"].dtype)
+with profiler.stage("3. Converting Data Types") as stage:
+    stage.rows_in = len(sales_df_cleaned_initial)
 
-sales_df_cleaned_initial["order_date"] = pd.to_datetime(
-    sales_df_cleaned_initial["order_date"]
-)
-print("\n'order_date' dtype:")
-print(sales_df_cleaned_initial["order_date"].dtype)
+    sales_df_cleaned_initial["customer_id"] = (
+        sales_df_cleaned_initial["customer_id"].astype("Int64")
+    )
+    print("\n'customer_id' dtype:")
+    print(sales_df_cleaned_initial["customer_id"].dtype)
 
-sales_df_cleaned_initial["amount_filled"] = (
-    sales_df_cleaned_initial["amount_filled"].astype(float)
-)
-print("\n'amount_filled' dtype:")
-print(sales_df_cleaned_initial["amount_filled"].dtype)
+    sales_df_cleaned_initial["order_date"] = pd.to_datetime(
+        sales_df_cleaned_initial["order_date"]
+    )
+    print("\n'order_date' dtype:")
+    print(sales_df_cleaned_initial["order_date"].dtype)
 
-# Replace original columns
-sales_df_cleaned_final = sales_df_cleaned_initial.drop(
-    columns=["amount", "region"]
-)
-sales_df_cleaned_final.rename(
-    columns={
-        "amount_filled": "amount",
-        "region_filled": "region"
-    },
-    inplace=True
-)
+    sales_df_cleaned_initial["amount_filled"] = (
+        sales_df_cleaned_initial["amount_filled"].astype(float)
+    )
+    print("\n'amount_filled' dtype:")
+    print(sales_df_cleaned_initial["amount_filled"].dtype)
+
+    # Replace original columns
+    sales_df_cleaned_final = sales_df_cleaned_initial.drop(
+        columns=["amount", "region"]
+    )
+    sales_df_cleaned_final.rename(
+        columns={
+            "amount_filled": "amount",
+            "region_filled": "region"
+        },
+        inplace=True
+    )
 
-print("\nDataFrame dtypes after conversions:")
-print(sales_df_cleaned_final.dtypes)
+    print("\nDataFrame dtypes after conversions:")
+    print(sales_df_cleaned_final.dtypes)
+
+    stage.rows_out = len(sales_df_cleaned_final)
 
 # -------------------------------------------------
 # 4. Duplicate Detection and Removal
 # -------------------------------------------------
-dup_count = sales_df_cleaned_final.duplicated().sum()
-print(f"\nDuplicate rows detected: {dup_count}")
+with profiler.stage("4. Duplicate Detection and Removal") as stage:
+    stage.rows_in = len(sales_df_cleaned_final)
+
+    # Reuse one duplicate mask for counting and dropping
+    dup_mask = sales_df_cleaned_final.duplicated()
+    dup_count = dup_mask.sum()
+    print(f"\nDuplicate rows detected: {dup_count}")
 
-sales_df_deduplicated = sales_df_cleaned_final.drop_duplicates()
-print("Rows after dropping duplicates:", len(sales_df_deduplicated))
+    # Always a separate frame, as drop_duplicates() returns
+    if dup_count:
+        sales_df_deduplicated = sales_df_cleaned_final[~dup_mask].copy()
+    else:
+        sales_df_deduplicated = sales_df_cleaned_final.copy()
+    print("Rows after dropping duplicates:", len(sales_df_deduplicated))
+
+    stage.rows_out = len(sales_df_deduplicated)
 
 # -------------------------------------------------
 # 5. Memory Optimization (Categorical dtypes)
 # -------------------------------------------------
-print("\nMemory usage BEFORE category conversion:")
-sales_df_deduplicated.info(verbose=False, memory_usage="deep")
+with profiler.stage("5. Memory Optimization") as stage:
+    stage.rows_in = len(sales_df_deduplicated)
+
+    # Low-cardinality text columns (per the profile) become categories
+    category_cols = [
+        col for col in ["product", "category", "region"]
+        if col in sales_df_deduplicated.columns
+        and sales_df_deduplicated[col].dtype == "object"
+        and column_profile.loc[col, "distinct_estimate"]
+        <= CATEGORY_MAX_DISTINCT_RATIO * data_profile["rows"]
+    ]
 
-for col in ["product", "category", "region"]:
-    if col in sales_df_deduplicated.columns and \
-       sales_df_deduplicated[col].dtype == "object":
+    for col in category_cols:
         sales_df_deduplicated[col] = (
             sales_df_deduplicated[col].astype("category")
         )
 
-print("\nMemory usage AFTER category conversion:")
-sales_df_deduplicated.info(verbose=False, memory_usage="deep")
+    # BEFORE comes from the profile (raw data, object dtype), so the slow
+    # deep scan of object columns is skipped. AFTER is the same columns
+    # as categories; a deep scan of categories only touches the labels.
+    memory_comparison = pd.DataFrame({
+        "before_bytes": column_profile.loc[category_cols, "memory_bytes"],
+        "after_bytes": sales_df_deduplicated[category_cols].memory_usage(
+            deep=True, index=False
+        ),
+    }).astype(int)
+    print(
+        "\nMemory usage of converted columns "
+        f"(BEFORE: raw data, {data_profile['rows']} rows, object; "
+        f"AFTER: cleaned data, {len(sales_df_deduplicated)} rows, category):"
+    )
+    print(memory_comparison)
+
+    stage.rows_out = len(sales_df_deduplicated)
 
 # -------------------------------------------------
 # Save cleaned data
 # -------------------------------------------------
 output_csv = "outputs/cleaned_sales.csv"
-sales_df_deduplicated.to_csv(output_csv, index=False)
+with profiler.stage("Save cleaned data") as stage:
+    stage.rows_in = len(sales_df_deduplicated)
+
+    write_report(sales_df_deduplicated, output_csv)
+
+    stage.wrote(output_csv)
+    stage.rows_out = len(sales_df_deduplicated)
 print(f"\nSaved '{output_csv}'")
 
 # -------------------------------------------------
@@ -145,13 +249,20 @@ verification_data = {
         sales_df_deduplicated["customer_id"].dtype
     ),
     "cleaned_sales_exists": os.path.exists(output_csv),
+    "data_profile_path": data_profile["cache_path"],
     "memory_optimized_columns": {
         col: str(sales_df_deduplicated[col].dtype)
         for col in ["product", "category", "region"]
         if col in sales_df_deduplicated.columns
-    }
+    },
+    "profile": profiler.summary(),
 }
 
+trace_path = profiler.write_chrome_trace()
+if trace_path:
+    print(f"Saved '{trace_path}'")
+profiler.close()
+
 verification_path = "outputs/verification_02_cleaning_and_dtypes.json"
 with open(verification_path, "w") as f:
     json.dump(verification_data, f, indent=2)
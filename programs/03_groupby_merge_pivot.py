@@ -6,6 +6,9 @@ Demonstrates:
 - Table joins with merge (left and inner)
 - Reshaping data with pivot_table
 - Simple visualization with seaborn/matplotlib
+
+Set PLAYBOOK_SAMPLE_FRACTION (e.g. 0.05) to run on a stratified sample
+with scaled-up estimates and confidence intervals for fast iteration.
 """
 
 import pandas as pd
@@ -13,155 +16,240 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
 import json
 
+# Shared helpers live in scripts/
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+)
+from profiling import StageProfiler  # noqa: E402
+from report_writer import write_report  # noqa: E402
+from sampling import (  # noqa: E402
+    WEIGHT_COL,
+    describe_sample,
+    drop_sample_columns,
+    estimate_aggregates,
+    get_sample_fraction,
+    output_path,
+    stratified_sample,
+)
+
 # Ensure 'outputs' directory exists
 os.makedirs("outputs", exist_ok=True)
 
+# Exact mode by default; approximate mode when a sample fraction is set
+sample_fraction = get_sample_fraction()
+
+# Records time, memory, rows and bytes for each numbered section
+profiler = StageProfiler("03_groupby_merge_pivot.py")
+
 # -------------------------------------------------
 # Load sales data (prefer cleaned output from step 02)
 # -------------------------------------------------
-try:
-    sales_df = pd.read_csv(
-        "outputs/cleaned_sales.csv",
-        dtype={"customer_id": "Int64"}
-    )
-    print("Loaded cleaned_sales.csv from outputs/")
-except FileNotFoundError:
-    print(
-        "outputs/cleaned_sales.csv not found. "
-        "Performing minimal cleaning on raw data."
-    )
-    raw_sales_df = pd.read_csv(
-        "data/sales_small.csv",
-        dtype={"customer_id": "Int64"}
-    )
+with profiler.stage("Load sales data") as stage:
+    try:
+        sales_df = pd.read_csv(
+            "outputs/cleaned_sales.csv",
+            dtype={"customer_id": "Int64"}
+        )
+        stage.read("outputs/cleaned_sales.csv")
+        print("Loaded cleaned_sales.csv from outputs/")
+    except FileNotFoundError:
+        print(
+            "outputs/cleaned_sales.csv not found. "
+            "Performing minimal cleaning on raw data."
+        )
+        raw_sales_df = pd.read_csv(
+            "data/sales_small.csv",
+            dtype={"customer_id": "Int64"}
+        )
+        stage.read("data/sales_small.csv")
 
-    raw_sales_df["amount"] = raw_sales_df["amount"].fillna(
-        raw_sales_df["amount"].median()
-    )
+        raw_sales_df["amount"] = raw_sales_df["amount"].fillna(
+            raw_sales_df["amount"].median()
+        )
 
-    sales_df = raw_sales_df.dropna(subset=["customer_id"]).copy()
+        sales_df = raw_sales_df.dropna(subset=["customer_id"]).copy()
 
-    mode_region = sales_df["region"].mode()[0]
-    sales_df["region"] = sales_df["region"].fillna(mode_region)
+        mode_region = sales_df["region"].mode()[0]
+        sales_df["region"] = sales_df["region"].fillna(mode_region)
 
-    sales_df = sales_df.drop_duplicates()
+        sales_df = sales_df.drop_duplicates()
 
-    sales_df["order_date"] = pd.to_datetime(sales_df["order_date"])
+        sales_df["order_date"] = pd.to_datetime(sales_df["order_date"])
 
-    for col in ["product", "category", "region"]:
-        if col in sales_df.columns and sales_df[col].dtype == "object":
-            sales_df[col] = sales_df[col].astype("category")
+        for col in ["product", "category", "region"]:
+            if col in sales_df.columns and sales_df[col].dtype == "object":
+                sales_df[col] = sales_df[col].astype("category")
 
-    sales_df.to_csv("outputs/cleaned_sales.csv", index=False)
+        write_report(sales_df, "outputs/cleaned_sales.csv")
+        stage.wrote("outputs/cleaned_sales.csv")
+
+    stage.rows_out = len(sales_df)
+
+# -------------------------------------------------
+# Approximate mode: stratified sample by region and category
+# -------------------------------------------------
+sample_info = None
+if sample_fraction is not None:
+    population_rows = len(sales_df)
+    sales_df = stratified_sample(sales_df, sample_fraction)
+    sample_info = describe_sample(sales_df, population_rows, sample_fraction)
+    print("\nApproximate mode:")
+    print(json.dumps(sample_info, indent=2))
 
 # -------------------------------------------------
 # Load customers data
 # -------------------------------------------------
-customers_df = pd.read_csv(
-    "data/customers_small.csv",
-    dtype={"customer_id": "Int64"}
-)
+with profiler.stage("Load customers data") as stage:
+    customers_df = pd.read_csv(
+        "data/customers_small.csv",
+        dtype={"customer_id": "Int64"}
+    )
+
+    print("\nSales Data Info:")
+    sales_df.info()
 
-print("\nSales Data Info:")
-sales_df.info()
+    print("\nCustomers Data Info:")
+    customers_df.info()
 
-print("\nCustomers Data Info:")
-customers_df.info()
+    stage.read("data/customers_small.csv")
+    stage.rows_out = len(customers_df)
 
 # -------------------------------------------------
 # 1. Groupby Aggregation
 # -------------------------------------------------
-region_summary = (
-    sales_df
-    .groupby("region")
-    .agg(
-        total_sales=("amount", "sum"),
-        order_count=("order_id", "count")
-    )
-    .reset_index()
-)
+with profiler.stage("1. Groupby Aggregation") as stage:
+    stage.rows_in = len(sales_df)
+
+    if sample_fraction is None:
+        region_summary = (
+            sales_df
+            .groupby("region")
+            .agg(
+                total_sales=("amount", "sum"),
+                order_count=("order_id", "count")
+            )
+            .reset_index()
+        )
+    else:
+        # Scaled-up estimates with 95% confidence intervals
+        region_summary = estimate_aggregates(
+            sales_df,
+            "region",
+            total_sales=("amount", "sum"),
+            order_count=("order_id", "count")
+        )
+
+    print("\nRegional Sales Summary:")
+    print(region_summary)
 
-print("\nRegional Sales Summary:")
-print(region_summary)
+    stage.rows_out = len(region_summary)
 
 # -------------------------------------------------
 # 2. Merging Tables
 # -------------------------------------------------
-merged_left = pd.merge(
-    sales_df,
-    customers_df,
-    on="customer_id",
-    how="left",
-    suffixes=("_sales", "_cust")
-)
+with profiler.stage("2. Merging Tables") as stage:
+    stage.rows_in = len(sales_df) + len(customers_df)
 
-print("\nMerged (Left Join) sample:")
-print(merged_left.head())
-print("Rows (left join):", len(merged_left))
-print(
-    "Missing customer names (left join):",
-    merged_left["name"].isna().sum()
-)
+    merged_left = pd.merge(
+        sales_df,
+        customers_df,
+        on="customer_id",
+        how="left",
+        suffixes=("_sales", "_cust")
+    )
 
-merged_inner = pd.merge(
-    sales_df,
-    customers_df,
-    on="customer_id",
-    how="inner",
-    suffixes=("_sales", "_cust")
-)
+    print("\nMerged (Left Join) sample:")
+    print(merged_left.head())
+    print("Rows (left join):", len(merged_left))
+    print(
+        "Missing customer names (left join):",
+        merged_left["name"].isna().sum()
+    )
 
-print("\nMerged (Inner Join) sample:")
-print(merged_inner.head())
-print("Rows (inner join):", len(merged_inner))
+    merged_inner = pd.merge(
+        sales_df,
+        customers_df,
+        on="customer_id",
+        how="inner",
+        suffixes=("_sales", "_cust")
+    )
+
+    print("\nMerged (Inner Join) sample:")
+    print(merged_inner.head())
+    print("Rows (inner join):", len(merged_inner))
+
+    # Sampled rows go to a separate file, without sampling bookkeeping
+    inner_csv = output_path(
+        "outputs/sales_customer_merged_inner.csv", sample_fraction
+    )
+    write_report(drop_sample_columns(merged_inner), inner_csv)
+    print(f"Saved '{inner_csv}'")
 
-inner_csv = "outputs/sales_customer_merged_inner.csv"
-merged_inner.to_csv(inner_csv, index=False)
-print(f"Saved '{inner_csv}'")
+    stage.wrote(inner_csv)
+    stage.rows_out = len(merged_left) + len(merged_inner)
 
 # -------------------------------------------------
 # 3. Reshaping with Pivot Table
 # -------------------------------------------------
-merged_left["amount"] = (
-    pd.to_numeric(merged_left["amount"], errors="coerce")
-    .fillna(0)
-)
+with profiler.stage("3. Reshaping with Pivot Table") as stage:
+    stage.rows_in = len(merged_left)
 
-category_region_sales = pd.pivot_table(
-    merged_left,
-    index="region",
-    columns="category",
-    values="amount",
-    aggfunc="sum",
-    fill_value=0
-)
+    merged_left["amount"] = (
+        pd.to_numeric(merged_left["amount"], errors="coerce")
+        .fillna(0)
+    )
+
+    # In approximate mode, weight each sampled row back up to the full data
+    pivot_values = "amount"
+    if sample_fraction is not None:
+        merged_left["weighted_amount"] = (
+            merged_left["amount"] * merged_left[WEIGHT_COL]
+        )
+        pivot_values = "weighted_amount"
+
+    category_region_sales = pd.pivot_table(
+        merged_left,
+        index="region",
+        columns="category",
+        values=pivot_values,
+        aggfunc="sum",
+        fill_value=0
+    )
+
+    print("\nPivot Table: Total Sales by Region and Category")
+    print(category_region_sales)
 
-print("\nPivot Table: Total Sales by Region and Category")
-print(category_region_sales)
+    stage.rows_out = len(category_region_sales)
 
 # -------------------------------------------------
 # 4. Visualization
 # -------------------------------------------------
-plt.figure(figsize=(10, 6))
-sns.barplot(
-    x="region",
-    y="total_sales",
-    data=region_summary,
-    palette="viridis"
-)
-plt.title("Total Sales by Region")
-plt.xlabel("Region")
-plt.ylabel("Total Sales Amount")
-plt.grid(axis="y", linestyle="--", alpha=0.7)
-plt.tight_layout()
+with profiler.stage("4. Visualization") as stage:
+    stage.rows_in = len(region_summary)
 
-plot_path = "outputs/aggregated_plot.png"
-plt.savefig(plot_path)
-plt.close()
+    plt.figure(figsize=(10, 6))
+    sns.barplot(
+        x="region",
+        y="total_sales",
+        data=region_summary,
+        palette="viridis"
+    )
+    plt.title("Total Sales by Region")
+    plt.xlabel("Region")
+    plt.ylabel("Total Sales Amount")
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+    plt.tight_layout()
+
+    plot_path = output_path("outputs/aggregated_plot.png", sample_fraction)
+    plt.savefig(plot_path)
+    plt.close()
+
+    print(f"Saved '{plot_path}'")
 
-print(f"Saved '{plot_path}'")
+    stage.wrote(plot_path)
 
 # -------------------------------------------------
 # Verification
@@ -173,9 +261,21 @@ verification_data = {
     "merged_inner_rows": len(merged_inner),
     "pivot_table_shape": category_region_sales.shape,
     "aggregated_plot_exists": os.path.exists(plot_path),
+    "profile": profiler.summary(),
 }
+if sample_info is not None:
+    verification_data["approximate"] = sample_info
 
-verification_path = "outputs/verification_03_groupby_merge_pivot.json"
+trace_path = profiler.write_chrome_trace(
+    output_path("outputs/trace_03_groupby_merge_pivot.json", sample_fraction)
+)
+if trace_path:
+    print(f"Saved '{trace_path}'")
+profiler.close()
+
+verification_path = output_path(
+    "outputs/verification_03_groupby_merge_pivot.json", sample_fraction
+)
 with open(verification_path, "w") as f:
     json.dump(verification_data, f, indent=2)
 
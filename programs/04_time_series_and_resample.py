@@ -13,139 +13,178 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
 import json
 
+# Shared helpers live in scripts/
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+)
+from profiling import StageProfiler  # noqa: E402
+from report_writer import write_report  # noqa: E402
+
 # Ensure 'outputs' directory exists
 os.makedirs("outputs", exist_ok=True)
 
+# Records time, memory, rows and bytes for each numbered section
+profiler = StageProfiler("04_time_series_and_resample.py")
+
 # -------------------------------------------------
 # Load sales data (prefer cleaned output from step 02)
 # -------------------------------------------------
-try:
-    sales_df = pd.read_csv(
-        "outputs/cleaned_sales.csv",
-        dtype={"customer_id": "Int64"}
-    )
-    print("Loaded cleaned_sales.csv from outputs/")
-except FileNotFoundError:
-    print(
-        "outputs/cleaned_sales.csv not found. "
-        "Performing minimal cleaning on raw data."
-    )
-    raw_sales_df = pd.read_csv(
-        "../data/sales_small.csv",
-        dtype={"customer_id": "Int64"}
-    )
-
-    raw_sales_df["amount"] = raw_sales_df["amount"].fillna(
-        raw_sales_df["amount"].median()
-    )
-
-    sales_df = raw_sales_df.dropna(subset=["customer_id"]).copy()
-
-    mode_region = sales_df["region"].mode()[0]
-    sales_df["region"] = sales_df["region"].fillna(mode_region)
-
-    sales_df = sales_df.drop_duplicates()
-
-    for col in ["product", "category", "region"]:
-        if col in sales_df.columns and sales_df[col].dtype == "object":
-            sales_df[col] = sales_df[col].astype("category")
-
-print("\nOriginal Sales Data Head:")
-print(sales_df.head())
-
-print("\nOriginal Data Types:")
-print(sales_df.dtypes)
+with profiler.stage("Load sales data") as stage:
+    try:
+        sales_df = pd.read_csv(
+            "outputs/cleaned_sales.csv",
+            dtype={"customer_id": "Int64"}
+        )
+        stage.read("outputs/cleaned_sales.csv")
+        print("Loaded cleaned_sales.csv from outputs/")
+    except FileNotFoundError:
+        print(
+            "outputs/cleaned_sales.csv not found. "
+            "Performing minimal cleaning on raw data."
+        )
+        raw_sales_df = pd.read_csv(
+            "../data/sales_small.csv",
+            dtype={"customer_id": "Int64"}
+        )
+        stage.read("../data/sales_small.csv")
+
+        raw_sales_df["amount"] = raw_sales_df["amount"].fillna(
+            raw_sales_df["amount"].median()
+        )
+
+        sales_df = raw_sales_df.dropna(subset=["customer_id"]).copy()
+
+        mode_region = sales_df["region"].mode()[0]
+        sales_df["region"] = sales_df["region"].fillna(mode_region)
+
+        sales_df = sales_df.drop_duplicates()
+
+        for col in ["product", "category", "region"]:
+            if col in sales_df.columns and sales_df[col].dtype == "object":
+                sales_df[col] = sales_df[col].astype("category")
+
+    print("\nOriginal Sales Data Head:")
+    print(sales_df.head())
+
+    print("\nOriginal Data Types:")
+    print(sales_df.dtypes)
+
+    stage.rows_out = len(sales_df)
 
 # -------------------------------------------------
 # 1. Convert to Datetime and Set Index
 # -------------------------------------------------
-sales_df["order_date"] = pd.to_datetime(sales_df["order_date"])
+with profiler.stage("1. Convert to Datetime and Set Index") as stage:
+    stage.rows_in = len(sales_df)
 
-sales_ts = (
-    sales_df
-    .set_index("order_date")
-    .sort_index()
-)
+    sales_df["order_date"] = pd.to_datetime(sales_df["order_date"])
+
+    sales_ts = (
+        sales_df
+        .set_index("order_date")
+        .sort_index()
+    )
 
-print("\nTime Series DataFrame Head:")
-print(sales_ts.head())
+    print("\nTime Series DataFrame Head:")
+    print(sales_ts.head())
 
-print("\nTime Series Index Type:")
-print(sales_ts.index.dtype)
+    print("\nTime Series Index Type:")
+    print(sales_ts.index.dtype)
+
+    stage.rows_out = len(sales_ts)
 
 # -------------------------------------------------
 # 2. Resample by Month
 # -------------------------------------------------
-monthly_sales = (
-    sales_ts["amount"]
-    .resample("M")
-    .sum()
-    .fillna(0)
-)
+with profiler.stage("2. Resample by Month") as stage:
+    stage.rows_in = len(sales_ts)
+
+    monthly_sales = (
+        sales_ts["amount"]
+        .resample("M")
+        .sum()
+        .fillna(0)
+    )
 
-print("\nMonthly Sales Sum (first 5 months):")
-print(monthly_sales.head())
+    print("\nMonthly Sales Sum (first 5 months):")
+    print(monthly_sales.head())
 
-plt.figure(figsize=(12, 6))
-monthly_sales.plot(
-    title="Monthly Total Sales",
-    marker="o",
-    linestyle="-",
-    color="skyblue"
-)
-plt.xlabel("Date")
-plt.ylabel("Total Sales Amount")
-plt.grid(True, linestyle="--", alpha=0.6)
-plt.tight_layout()
+    plt.figure(figsize=(12, 6))
+    monthly_sales.plot(
+        title="Monthly Total Sales",
+        marker="o",
+        linestyle="-",
+        color="skyblue"
+    )
+    plt.xlabel("Date")
+    plt.ylabel("Total Sales Amount")
+    plt.grid(True, linestyle="--", alpha=0.6)
+    plt.tight_layout()
 
-monthly_plot = "outputs/monthly_sales_plot.png"
-plt.savefig(monthly_plot)
-plt.close()
+    monthly_plot = "outputs/monthly_sales_plot.png"
+    plt.savefig(monthly_plot)
+    plt.close()
 
-print(f"Saved '{monthly_plot}'")
+    print(f"Saved '{monthly_plot}'")
+
+    stage.wrote(monthly_plot)
+    stage.rows_out = len(monthly_sales)
 
 # -------------------------------------------------
 # 3. Rolling Mean Example
 # -------------------------------------------------
-rolling_mean_3m = monthly_sales.rolling(window=3).mean()
+with profiler.stage("3. Rolling Mean Example") as stage:
+    stage.rows_in = len(monthly_sales)
 
-print("\n3-Month Rolling Mean (first 5 values):")
-print(rolling_mean_3m.head())
+    rolling_mean_3m = monthly_sales.rolling(window=3).mean()
 
-plt.figure(figsize=(12, 6))
-monthly_sales.plot(
-    label="Monthly Sales",
-    alpha=0.7,
-    color="skyblue"
-)
-rolling_mean_3m.plot(
-    label="3-Month Rolling Mean",
-    color="red",
-    linestyle="--",
-    linewidth=2
-)
-plt.title("Monthly Sales vs. 3-Month Rolling Mean")
-plt.xlabel("Date")
-plt.ylabel("Amount")
-plt.legend()
-plt.grid(True, linestyle="--", alpha=0.6)
-plt.tight_layout()
+    print("\n3-Month Rolling Mean (first 5 values):")
+    print(rolling_mean_3m.head())
+
+    plt.figure(figsize=(12, 6))
+    monthly_sales.plot(
+        label="Monthly Sales",
+        alpha=0.7,
+        color="skyblue"
+    )
+    rolling_mean_3m.plot(
+        label="3-Month Rolling Mean",
+        color="red",
+        linestyle="--",
+        linewidth=2
+    )
+    plt.title("Monthly Sales vs. 3-Month Rolling Mean")
+    plt.xlabel("Date")
+    plt.ylabel("Amount")
+    plt.legend()
+    plt.grid(True, linestyle="--", alpha=0.6)
+    plt.tight_layout()
 
-rolling_plot = "outputs/rolling_mean_plot.png"
-plt.savefig(rolling_plot)
-plt.close()
+    rolling_plot = "outputs/rolling_mean_plot.png"
+    plt.savefig(rolling_plot)
+    plt.close()
 
-print(f"Saved '{rolling_plot}'")
+    print(f"Saved '{rolling_plot}'")
+
+    stage.wrote(rolling_plot)
+    stage.rows_out = len(rolling_mean_3m)
 
 # -------------------------------------------------
 # Save Time Series Report
 # -------------------------------------------------
 report_csv = "outputs/time_series_report.csv"
-monthly_sales.reset_index().to_csv(report_csv, index=False)
+with profiler.stage("Save Time Series Report") as stage:
+    stage.rows_in = len(monthly_sales)
+
+    write_report(monthly_sales.reset_index(), report_csv)
 
-print(f"Saved '{report_csv}'")
+    print(f"Saved '{report_csv}'")
+
+    stage.wrote(report_csv)
+    stage.rows_out = len(monthly_sales)
 
 # -------------------------------------------------
 # Verification
@@ -157,8 +196,14 @@ verification_data = {
     "time_series_report_exists": os.path.exists(report_csv),
     "monthly_sales_plot_exists": os.path.exists(monthly_plot),
     "rolling_mean_plot_exists": os.path.exists(rolling_plot),
+    "profile": profiler.summary(),
 }
 
+trace_path = profiler.write_chrome_trace()
+if trace_path:
+    print(f"Saved '{trace_path}'")
+profiler.close()
+
 verification_path = "outputs/verification_04_time_series_and_resample.json"
 with open(verification_path, "w") as f:
     json.dump(verification_data, f, indent=2)
@@ -0,0 +1,103 @@
+import csv
+import gzip
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from report_writer import write_report
+
+# Small blocks and several workers so every frame spans many blocks
+WRITER_OPTIONS = {'workers': 3, 'chunk_rows': 5}
+
+
+def make_frame():
+    """Frame with the dtypes whose CSV text pandas picks per column."""
+    rows = 23
+    midnight = pd.Timestamp('2024-01-01')
+    datetimes = pd.Series(pd.date_range(midnight, periods=rows, freq='D'))
+    # Only the last block has times of day (and sub-second ones)
+    datetimes.iloc[-1] += pd.Timedelta(milliseconds=250)
+    datetimes.iloc[7] = pd.NaT
+    datetimes_us = datetimes.copy()
+    datetimes_us.iloc[-2] += pd.Timedelta(microseconds=5)
+    datetimes_ns = datetimes.copy()
+    datetimes_ns.iloc[-2] += pd.Timedelta(nanoseconds=5)
+    timedeltas = pd.Series(pd.to_timedelta(np.arange(rows), unit='D'))
+    timedeltas.iloc[-1] += pd.Timedelta(seconds=1.5)
+    timedeltas.iloc[3] = pd.NaT
+    # Midnight and 10:00 values in separate blocks
+    hours = np.where(np.arange(rows) < 12, 0, 10)
+    category_datetimes = pd.Categorical(midnight + pd.to_timedelta(hours, unit='h'))
+    category_datetimes_na = pd.Series(category_datetimes).astype('object')
+    category_datetimes_na.iloc[20] = None
+
+    return pd.DataFrame({
+        'id': np.arange(rows),
+        'amount': np.linspace(0, 10, rows) / 3,
+        'datetime': datetimes,
+        'datetime_us': datetimes_us,
+        'datetime_ns': datetimes_ns,
+        'datetime_s': pd.date_range(midnight, periods=rows, freq='13h').astype('datetime64[s]'),
+        'datetime_tz': pd.date_range(midnight, periods=rows, freq='11h', tz='Europe/Berlin'),
+        'timedelta': timedeltas,
+        'period': pd.period_range('2024-01', periods=rows, freq='M'),
+        'category_datetime': category_datetimes,
+        'category_datetime_na': pd.Categorical(category_datetimes_na),
+        'category_timedelta': pd.Categorical(pd.to_timedelta(hours % 9, unit='D')),
+        'customer_id': pd.array([None if i % 4 == 0 else i for i in range(rows)], dtype='Int64'),
+        'region': ['North', None, 'South, East'] * 7 + ['West', 'North'],
+    })
+
+
+def check_byte_identity(df, directory, **csv_kwargs):
+    """write_report output must match df.to_csv byte for byte."""
+    expected = df.to_csv(index=False, **csv_kwargs).encode()
+    label = ', '.join(f'{key}={value!r}' for key, value in csv_kwargs.items()) or 'defaults'
+
+    path = os.path.join(directory, 'report.csv')
+    write_report(df, path, **WRITER_OPTIONS, **csv_kwargs)
+    with open(path, 'rb') as f:
+        actual = f.read()
+    assert actual == expected, f"CSV differs from to_csv ({label})"
+
+    path = os.path.join(directory, 'report.csv.gz')
+    write_report(df, path, **WRITER_OPTIONS, **csv_kwargs)
+    with gzip.open(path, 'rb') as f:
+        actual = f.read()
+    assert actual == expected, f"gzip CSV differs from to_csv ({label})"
+    return label
+
+
+def run_checks():
+    df = make_frame()
+    option_sets = [
+        {},
+        {'float_format': '%.3f'},
+        {'na_rep': 'NA'},
+        {'date_format': '%d/%m/%Y %H:%M'},
+        {'quoting': csv.QUOTE_NONNUMERIC},
+        {'float_format': '%.2f', 'na_rep': 'missing', 'date_format': '%Y-%m-%dT%H:%M:%S.%f'},
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for number, csv_kwargs in enumerate(option_sets, start=1):
+            label = check_byte_identity(df, directory, **csv_kwargs)
+            print(f"Check {number}: write_report matches to_csv ({label}) - PASS")
+
+        # Every column on its own, so one column's format cannot mask another's
+        number = len(option_sets) + 1
+        for column in df.columns:
+            check_byte_identity(df[[column]], directory)
+        print(f"Check {number}: Each column on its own matches to_csv - PASS")
+
+    print("\nALL_CHECKS_PASS")
+    return True
+
+
+if __name__ == '__main__':
+    if run_checks():
+        exit(0)
+    else:
+        exit(1)
@@ -0,0 +1,164 @@
+"""
+Single-pass data profile for the playbook programs.
+
+`profile_frame(df)` sweeps each column once per chunk and collects:
+- null counts
+- distinct-count estimates (exact below SKETCH_SIZE distinct values)
+- min / max
+- deep memory footprint
+- the number of duplicate rows
+
+`load_or_build_profile(source_path, df)` caches the result as a JSON
+artifact next to the other outputs, so later steps (imputation choices,
+category conversion) read the profile instead of rescanning the data.
+The cache is rebuilt whenever the source file's size or mtime, the
+frame's columns/dtypes (e.g. a different `dtype=` mapping when reading
+it) or the profile format version changes.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Bump when the profile layout or statistics change to invalidate caches
+PROFILE_VERSION = 1
+
+# K-minimum-values sketch size; ~3% relative error above this many
+# distinct values, exact below it
+SKETCH_SIZE = 1024
+
+_HASH_SPACE = float(2 ** 64)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def profile_frame(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Profile `df` in one sweep per column and chunk; return a dict."""
+    columns = {
+        col: {
+            "dtype": str(df[col].dtype),
+            "null_count": 0,
+            "min": None,
+            "max": None,
+            "memory_bytes": 0,
+            "_sketch": np.empty(0, dtype=np.uint64),
+        }
+        for col in df.columns
+    }
+    row_hashes = []
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        row_hash = np.zeros(len(chunk), dtype=np.uint64)
+
+        for col, stats in columns.items():
+            values = chunk[col]
+            nulls = values.isna().to_numpy()
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+            stats["null_count"] += int(nulls.sum())
+            stats["memory_bytes"] += int(
+                values.memory_usage(deep=True, index=False)
+            )
+            stats["_sketch"] = _merge_sketch(stats["_sketch"], hashes[~nulls])
+            _update_min_max(stats, values[~nulls])
+
+            # Combine column hashes into a row hash for duplicate detection
+            row_hash = (row_hash ^ hashes) * _FNV_PRIME
+
+        row_hashes.append(row_hash)
+
+    all_row_hashes = (
+        np.concatenate(row_hashes) if row_hashes
+        else np.empty(0, dtype=np.uint64)
+    )
+    for stats in columns.values():
+        stats["distinct_estimate"] = _estimate_distinct(stats.pop("_sketch"))
+
+    return {
+        "rows": len(df),
+        "duplicate_rows": int(len(all_row_hashes) - len(pd.unique(all_row_hashes))),
+        "memory_bytes": sum(stats["memory_bytes"] for stats in columns.values()),
+        "columns": columns,
+    }
+
+
+def load_or_build_profile(source_path, df, cache_path=None,
+                          chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Return the cached profile of `source_path`, rebuilding it from `df`
+    if the cache is missing, the source file has changed or `df` was
+    read with different columns/dtypes.
+    """
+    if cache_path is None:
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        cache_path = os.path.join("outputs", f"profile_{name}.json")
+
+    stat = os.stat(source_path)
+    source = {
+        "path": source_path,
+        "size_bytes": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "columns": [[str(col), str(dtype)] for col, dtype in df.dtypes.items()],
+        "profile_version": PROFILE_VERSION,
+    }
+
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached.get("source") == source:
+            cached["cache_path"] = cache_path
+            cached["from_cache"] = True
+            return cached
+
+    profile = {"source": source, **profile_frame(df, chunk_rows)}
+    with open(cache_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    profile["cache_path"] = cache_path
+    profile["from_cache"] = False
+    return profile
+
+
+def _merge_sketch(sketch, hashes):
+    """Keep the SKETCH_SIZE smallest distinct hashes seen so far."""
+    hashes = pd.unique(hashes)
+    if len(hashes) > SKETCH_SIZE:
+        hashes = np.partition(hashes, SKETCH_SIZE - 1)[:SKETCH_SIZE]
+    return np.union1d(sketch, hashes)[:SKETCH_SIZE]
+
+
+def _estimate_distinct(sketch):
+    if len(sketch) < SKETCH_SIZE:
+        return len(sketch)
+    return int(round((SKETCH_SIZE - 1) * _HASH_SPACE / (float(sketch[-1]) + 1)))
+
+
+def _update_min_max(stats, values):
+    """Fold a chunk's non-null min/max into `stats` (JSON-friendly)."""
+    if values.empty:
+        return
+    try:
+        chunk_min, chunk_max = values.min(), values.max()
+    except TypeError:
+        # Mixed types (e.g. str and int) have no ordering
+        return
+    chunk_min, chunk_max = _to_json_value(chunk_min), _to_json_value(chunk_max)
+    try:
+        if stats["min"] is None or chunk_min < stats["min"]:
+            stats["min"] = chunk_min
+        if stats["max"] is None or chunk_max > stats["max"]:
+            stats["max"] = chunk_max
+    except TypeError:
+        stats["min"] = stats["max"] = None
+
+
+def _to_json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (int, float, str, bool)):
+        return value
+    # Timestamps and other scalars sort correctly as ISO strings
+    return str(value)
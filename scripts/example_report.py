@@ -2,61 +2,137 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import json
 
-def generate_report():
+from profiling import StageProfiler
+from report_writer import write_report
+from sampling import (
+    describe_sample, estimate_aggregates, get_sample_fraction, output_path,
+    stratified_sample
+)
+
+def generate_report(sample_fraction=None):
     # Ensure 'outputs' directory exists
     os.makedirs('outputs', exist_ok=True)
 
+    # Exact mode unless a sample fraction is passed or set in PLAYBOOK_SAMPLE_FRACTION
+    sample_fraction = get_sample_fraction(sample_fraction)
+
+    # Records time, memory, rows and bytes for each section
+    profiler = StageProfiler('example_report.py')
+
     # Load data, ensuring customer_id is read as nullable integer
-    sales_df = pd.read_csv('data/sales_small.csv', dtype={'customer_id': 'Int64'})
-    customers_df = pd.read_csv('data/customers_small.csv', dtype={'customer_id': 'Int64'})
+    with profiler.stage('Load Data') as stage:
+        sales_df = pd.read_csv('data/sales_small.csv', dtype={'customer_id': 'Int64'})
+        customers_df = pd.read_csv('data/customers_small.csv', dtype={'customer_id': 'Int64'})
+        stage.read('data/sales_small.csv')
+        stage.read('data/customers_small.csv')
+        stage.rows_out = len(sales_df) + len(customers_df)
+
+    # --- Approximate Mode: Stratified Sample by region and category ---
+    sample_info = None
+    if sample_fraction is not None:
+        population_rows = len(sales_df)
+        sales_df = stratified_sample(sales_df, sample_fraction)
+        sample_info = describe_sample(sales_df, population_rows, sample_fraction)
+        print(f"Approximate mode: {sample_info}")
 
     # --- Data Cleaning and Preprocessing ---
-    # 1. Impute missing amounts with median
-    sales_df['amount'] = sales_df['amount'].fillna(sales_df['amount'].median())
-    
-    # 2. Drop rows with missing customer_id for merge consistency
-    sales_df_cleaned = sales_df.dropna(subset=['customer_id']).copy()
-    
-    # 3. Impute missing region with mode
-    mode_region = sales_df_cleaned['region'].mode()[0]
-    sales_df_cleaned['region'] = sales_df_cleaned['region'].fillna(mode_region)
-    
-    # 4. Convert categorical columns to 'category' dtype for memory optimization
-    for col in ['product', 'category', 'region']:
-        if col in sales_df_cleaned.columns and sales_df_cleaned[col].dtype == 'object':
-            sales_df_cleaned[col] = sales_df_cleaned[col].astype('category')
+    with profiler.stage('Data Cleaning and Preprocessing') as stage:
+        stage.rows_in = len(sales_df)
+
+        # 1. Impute missing amounts with median
+        sales_df['amount'] = sales_df['amount'].fillna(sales_df['amount'].median())
+
+        # 2. Drop rows with missing customer_id for merge consistency
+        sales_df_cleaned = sales_df.dropna(subset=['customer_id']).copy()
+
+        # 3. Impute missing region with mode
+        mode_region = sales_df_cleaned['region'].mode()[0]
+        sales_df_cleaned['region'] = sales_df_cleaned['region'].fillna(mode_region)
+
+        # 4. Convert categorical columns to 'category' dtype for memory optimization
+        for col in ['product', 'category', 'region']:
+            if col in sales_df_cleaned.columns and sales_df_cleaned[col].dtype == 'object':
+                sales_df_cleaned[col] = sales_df_cleaned[col].astype('category')
+
+        stage.rows_out = len(sales_df_cleaned)
 
     # --- Merge Data ---
     # Inner merge to combine sales and customer data where customer_id matches in both
-    merged_df = pd.merge(sales_df_cleaned, customers_df, on='customer_id', how='inner', suffixes=('_sales', '_cust'))
+    with profiler.stage('Merge Data') as stage:
+        stage.rows_in = len(sales_df_cleaned) + len(customers_df)
+        merged_df = pd.merge(sales_df_cleaned, customers_df, on='customer_id', how='inner', suffixes=('_sales', '_cust'))
+        stage.rows_out = len(merged_df)
 
     # --- Groupby Aggregation ---
     # Calculate total sales and order count by region and category
-    region_category_sales = merged_df.groupby(['region', 'category']).agg(
-        total_sales=('amount', 'sum'),
-        order_count=('order_id', 'count')
-    ).reset_index()
+    with profiler.stage('Groupby Aggregation') as stage:
+        stage.rows_in = len(merged_df)
+        if sample_fraction is None:
+            region_category_sales = merged_df.groupby(['region', 'category']).agg(
+                total_sales=('amount', 'sum'),
+                order_count=('order_id', 'count')
+            ).reset_index()
+        else:
+            # Scale sample sums/counts up to full-data estimates with 95% confidence intervals
+            region_category_sales = estimate_aggregates(
+                merged_df, ['region', 'category'],
+                total_sales=('amount', 'sum'),
+                order_count=('order_id', 'count')
+            )
+        stage.rows_out = len(region_category_sales)
 
     # --- Save Aggregated CSV Report ---
-    report_path_csv = 'outputs/aggregated_report.csv'
-    region_category_sales.to_csv(report_path_csv, index=False)
+    # Approximate runs write *_approx files and leave exact outputs alone
+    report_path_csv = output_path('outputs/aggregated_report.csv', sample_fraction)
+    with profiler.stage('Save Aggregated CSV Report') as stage:
+        stage.rows_in = len(region_category_sales)
+        write_report(region_category_sales, report_path_csv)
+        stage.wrote(report_path_csv)
+        stage.rows_out = len(region_category_sales)
     print(f"Generated report: {report_path_csv}")
 
     # --- Produce Visualization ---
-    plt.figure(figsize=(12, 7))
-    sns.barplot(x='region', y='total_sales', hue='category', data=region_category_sales, palette='viridis')
-    plt.title('Total Sales by Region and Category')
-    plt.xlabel('Region')
-    plt.ylabel('Total Sales Amount')
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    # Save plot
-    report_path_png = 'outputs/aggregated_plot_script.png'
-    plt.savefig(report_path_png)
-    print(f"Generated plot: {report_path_png}")
-    plt.close() # Close plot to free memory
+    report_path_png = output_path('outputs/aggregated_plot_script.png', sample_fraction)
+    with profiler.stage('Produce Visualization') as stage:
+        stage.rows_in = len(region_category_sales)
+        plt.figure(figsize=(12, 7))
+        sns.barplot(x='region', y='total_sales', hue='category', data=region_category_sales, palette='viridis')
+        plt.title('Total Sales by Region and Category')
+        plt.xlabel('Region')
+        plt.ylabel('Total Sales Amount')
+        plt.xticks(rotation=45)
+        plt.grid(axis='y', linestyle='--', alpha=0.7)
+        plt.tight_layout()
+        # Save plot
+        plt.savefig(report_path_png)
+        print(f"Generated plot: {report_path_png}")
+        plt.close() # Close plot to free memory
+        stage.wrote(report_path_png)
+
+    # --- Verification ---
+    verification_data = {
+        'script': 'example_report.py',
+        'aggregated_report_rows': len(region_category_sales),
+        'aggregated_report_exists': os.path.exists(report_path_csv),
+        'aggregated_plot_exists': os.path.exists(report_path_png),
+        'profile': profiler.summary(),
+    }
+    if sample_info is not None:
+        verification_data['approximate'] = sample_info
+
+    trace_path = profiler.write_chrome_trace(
+        output_path('outputs/trace_example_report.json', sample_fraction)
+    )
+    if trace_path:
+        print(f"Generated trace: {trace_path}")
+    profiler.close()
+
+    verification_path = output_path('outputs/verification_example_report.json', sample_fraction)
+    with open(verification_path, 'w') as f:
+        json.dump(verification_data, f, indent=2)
+    print(f"Generated verification: {verification_path}")
 if __name__ == '__main__':
     generate_report()
-    print("Example report generation complete.")
\ No newline at end of file
+    print("Example report generation complete.")
@@ -0,0 +1,275 @@
+"""
+Lightweight stage profiler for the playbook programs.
+
+Wrap each numbered section of a program in a stage to record:
+- wall time and CPU time (including worker processes)
+- peak memory (peak RSS within the stage by default)
+- rows in and rows out
+- bytes read and written
+
+    profiler = StageProfiler("01_quickstart_basic.py")
+    with profiler.stage("1. Load Data") as stage:
+        sales_df = pd.read_csv(path)
+        stage.read(path)
+        stage.rows_out = len(sales_df)
+
+    verification_data["profile"] = profiler.summary()
+    profiler.write_chrome_trace()
+    profiler.close()
+
+Set PLAYBOOK_CHROME_TRACE=1 to also write a Chrome trace
+(outputs/trace_<script>.json) that can be opened in chrome://tracing
+or https://ui.perfetto.dev.
+
+By default peak memory is the peak RSS within each stage: on Linux the
+kernel's high-water mark (VmHWM) is reset through /proc/self/clear_refs
+when a stage starts and read when it ends ("memory_source":
+"stage_peak_rss"). Elsewhere only the process's lifetime peak RSS is
+available, so a stage reports the highest RSS reached so far
+("process_peak_rss"). Worker processes (e.g. the report writer's pool)
+have their own RSS: `worker_peak_memory_bytes` is the largest finished
+worker's peak RSS, reported on the stage in which it was reached.
+
+Set PLAYBOOK_TRACE_MEMORY=1 to record the peak Python/NumPy allocation
+within each stage with tracemalloc instead; it slows allocation-heavy
+code down many times over, so keep it for debugging rather than
+production runs.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CHROME_TRACE_ENV = "PLAYBOOK_CHROME_TRACE"
+TRACE_MEMORY_ENV = "PLAYBOOK_TRACE_MEMORY"
+
+
+def _peak_rss_bytes(who=None):
+    """
+    Lifetime peak resident set size from getrusage, or None where
+    unavailable. For RUSAGE_CHILDREN this is the largest finished child.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(
+        resource.RUSAGE_SELF if who is None else who
+    ).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _reset_stage_peak_rss():
+    """
+    Reset this process's peak RSS (VmHWM) to its current RSS.
+
+    Linux only; returns False where /proc/self/clear_refs is missing or
+    not writable.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _stage_peak_rss_bytes():
+    """Peak RSS (VmHWM) since the last `_reset_stage_peak_rss()`."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def _worker_peak_rss_bytes():
+    if resource is None:
+        return None
+    return _peak_rss_bytes(resource.RUSAGE_CHILDREN)
+
+
+def _cpu_time_s():
+    """
+    CPU time of this process plus its finished child processes.
+
+    Worker processes (e.g. the report writer's pool) are only counted in
+    RUSAGE_CHILDREN once they have been joined, which happens before the
+    stage that started them ends.
+    """
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+
+class Stage:
+    """Measurements for a single profiled stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.wall_time_s = 0.0
+        self.cpu_time_s = 0.0
+        self.peak_memory_bytes = 0
+        self.worker_peak_memory_bytes = None
+        self.start_us = 0
+
+    def read(self, path):
+        """Record a file read by this stage."""
+        if os.path.exists(path):
+            self.bytes_read += os.path.getsize(path)
+
+    def wrote(self, path):
+        """Record a file written by this stage."""
+        if os.path.exists(path):
+            self.bytes_written += os.path.getsize(path)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wall_time_s": round(self.wall_time_s, 6),
+            "cpu_time_s": round(self.cpu_time_s, 6),
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "worker_peak_memory_bytes": self.worker_peak_memory_bytes,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class StageProfiler:
+    """Collects Stage measurements for one program run."""
+
+    def __init__(self, script, trace_memory=None):
+        self.script = script
+        self.stages = []
+        self._origin = time.perf_counter()
+        if trace_memory is None:
+            trace_memory = bool(os.environ.get(TRACE_MEMORY_ENV))
+        if trace_memory:
+            self.memory_source = "tracemalloc"
+        elif _reset_stage_peak_rss():
+            self.memory_source = "stage_peak_rss"
+        else:
+            self.memory_source = "process_peak_rss"
+        # Only stop tracemalloc in close() if this profiler started it
+        self._started_tracemalloc = (
+            trace_memory and not tracemalloc.is_tracing()
+        )
+        if self._started_tracemalloc:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager that times and measures one stage."""
+        stage = Stage(name)
+        tracing = self.memory_source == "tracemalloc"
+        if tracing:
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        elif self.memory_source == "stage_peak_rss":
+            _reset_stage_peak_rss()
+        workers_start = _worker_peak_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_time_s()
+        try:
+            yield stage
+        finally:
+            stage.cpu_time_s = _cpu_time_s() - cpu_start
+            wall_end = time.perf_counter()
+            stage.wall_time_s = wall_end - wall_start
+            stage.start_us = int((wall_start - self._origin) * 1e6)
+            if tracing:
+                stage.peak_memory_bytes = max(
+                    0, tracemalloc.get_traced_memory()[1] - mem_start
+                )
+            elif self.memory_source == "stage_peak_rss":
+                stage.peak_memory_bytes = _stage_peak_rss_bytes()
+            else:
+                stage.peak_memory_bytes = _peak_rss_bytes()
+            # The children's peak can't be reset; only a new high shows
+            # which stage's workers it belongs to
+            workers_end = _worker_peak_rss_bytes()
+            if workers_end and workers_end != workers_start:
+                stage.worker_peak_memory_bytes = workers_end
+            self.stages.append(stage)
+
+    def close(self):
+        """Stop memory tracing started by this profiler."""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def summary(self):
+        """Per-stage and total measurements for the verification JSON."""
+        stages = [stage.to_dict() for stage in self.stages]
+        peaks = [
+            s["peak_memory_bytes"] for s in stages
+            if s["peak_memory_bytes"] is not None
+        ]
+        worker_peaks = [
+            s["worker_peak_memory_bytes"] for s in stages
+            if s["worker_peak_memory_bytes"] is not None
+        ]
+        return {
+            "memory_source": self.memory_source,
+            "stages": stages,
+            "total": {
+                "wall_time_s": round(
+                    sum(s["wall_time_s"] for s in stages), 6
+                ),
+                "cpu_time_s": round(
+                    sum(s["cpu_time_s"] for s in stages), 6
+                ),
+                "peak_memory_bytes": max(peaks, default=None),
+                "worker_peak_memory_bytes": max(worker_peaks, default=None),
+                "bytes_read": sum(s["bytes_read"] for s in stages),
+                "bytes_written": sum(s["bytes_written"] for s in stages),
+            },
+        }
+
+    def write_chrome_trace(self, path=None, force=False):
+        """
+        Write stages as Chrome trace "complete" events.
+
+        Only writes when PLAYBOOK_CHROME_TRACE is set (or `force` is
+        True). Returns the path written, or None.
+        """
+        if not (force or os.environ.get(CHROME_TRACE_ENV)):
+            return None
+        if path is None:
+            name = os.path.splitext(os.path.basename(self.script))[0]
+            path = os.path.join("outputs", f"trace_{name}.json")
+
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = [
+            {
+                "name": stage.name,
+                "cat": self.script,
+                "ph": "X",
+                "ts": stage.start_us,
+                "dur": int(stage.wall_time_s * 1e6),
+                "pid": pid,
+                "tid": tid,
+                "args": stage.to_dict(),
+            }
+            for stage in self.stages
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events}, f, indent=2)
+        return path
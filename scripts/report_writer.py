@@ -0,0 +1,309 @@
+"""
+Report writer shared by the playbook programs.
+
+`write_report(df, path)` replaces `df.to_csv(path, index=False)`:
+- CSV is formatted in row blocks by a worker pool and written in order
+  (a forked process pool on Linux; elsewhere blocks are formatted
+  serially)
+- CSV can be streamed through gzip or zstd compression
+- Parquet and Feather are available as alternative targets
+
+The target is inferred from the file extension (.csv, .csv.gz, .csv.zst,
+.parquet, .feather) unless `file_format` / `compression` are passed.
+Plain CSV output is byte-identical to `df.to_csv(path, index=False)`
+for any number of workers.
+
+The number of workers defaults to the CPU count and can be set with the
+PLAYBOOK_WRITER_WORKERS environment variable (1 = single-threaded).
+Frames that fit in one block, and any CSV written outside Linux, are
+formatted single-threaded.
+
+Parquet/Feather need `pyarrow` and zstd needs `zstandard`
+(see requirements.txt).
+"""
+
+import csv
+import gzip
+import io
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+WORKERS_ENV = "PLAYBOOK_WRITER_WORKERS"
+DEFAULT_CHUNK_ROWS = 100_000
+
+_NAT = np.iinfo(np.int64).min
+_PER_SECOND = {"s": 1, "ms": 1_000, "us": 1_000_000, "ns": 1_000_000_000}
+
+# Forking avoids pickling blocks and re-running the calling program,
+# which has no `__main__` guard, in each worker. Fork is not safe on
+# macOS once matplotlib and friends are imported and Windows has no fork;
+# threads would not help either since to_csv holds the GIL, so CSV is
+# formatted serially on other platforms.
+_CAN_FORK = sys.platform.startswith("linux")
+
+# (frame, to_csv options, column renderers) of the write a pool worker
+# process serves, set by the pool initializer after fork
+_worker_args = None
+
+
+def infer_target(path):
+    """Return (file_format, compression) for a report path."""
+    name = os.fspath(path).lower()
+    compression = None
+    if name.endswith(".gz"):
+        compression, name = "gzip", name[:-3]
+    elif name.endswith(".zst"):
+        compression, name = "zstd", name[:-4]
+
+    for file_format in ("parquet", "feather"):
+        if name.endswith(f".{file_format}"):
+            if compression:
+                raise ValueError(
+                    f"'{path}': {file_format} files compress internally; "
+                    f"use a plain .{file_format} path and pass "
+                    "compression= to choose the codec"
+                )
+            return file_format, None
+    return "csv", compression
+
+
+def get_workers(workers=None):
+    """Number of CSV formatting workers (PLAYBOOK_WRITER_WORKERS or CPUs)."""
+    if workers is None:
+        workers = os.environ.get(WORKERS_ENV) or os.cpu_count() or 1
+    workers = int(workers)
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    return workers
+
+
+def write_report(df, path, file_format=None, compression=None,
+                 workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, **csv_kwargs):
+    """
+    Write `df` (without its index) to `path` and return the path.
+
+    Extra keyword arguments are passed to `DataFrame.to_csv`, including
+    `mode="a"` to append to an existing (optionally compressed) CSV.
+    """
+    inferred_format, inferred_compression = infer_target(path)
+    file_format = file_format or inferred_format
+    compression = compression or inferred_compression
+
+    # Columnar targets compress internally; keep pyarrow's default codec
+    columnar_kwargs = {"compression": compression} if compression else {}
+    if file_format == "parquet":
+        df.to_parquet(path, index=False, **columnar_kwargs)
+        return path
+    if file_format == "feather":
+        df.reset_index(drop=True).to_feather(path, **columnar_kwargs)
+        return path
+    if file_format != "csv":
+        raise ValueError(f"Unsupported report format: '{file_format}'")
+    if compression not in (None, "gzip", "zstd"):
+        raise ValueError(f"Unsupported CSV compression: '{compression}'")
+
+    workers = get_workers(workers)
+    serial = workers == 1 or len(df) <= chunk_rows or not _CAN_FORK
+    if compression is None and serial:
+        df.to_csv(path, index=False, **csv_kwargs)
+        return path
+
+    # File options that to_csv would otherwise apply to the open file
+    mode = csv_kwargs.pop("mode", "w")
+    if mode not in ("w", "a", "x"):
+        raise ValueError(f"Unsupported CSV write mode: '{mode}'")
+    encoding = csv_kwargs.pop("encoding", None) or "utf-8"
+    errors = csv_kwargs.pop("errors", "strict")
+    with _open_stream(path, compression, mode) as stream:
+        for text in _iter_csv_blocks(df, workers, chunk_rows, csv_kwargs):
+            stream.write(text.encode(encoding, errors))
+    return path
+
+
+def _open_stream(path, compression, mode="w"):
+    """Binary output stream, optionally compressing as it goes."""
+    mode += "b"
+    if compression == "gzip":
+        return gzip.open(path, mode)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as err:
+            raise ImportError(
+                "zstd compression requires the 'zstandard' package: "
+                "pip install zstandard"
+            ) from err
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode))
+    return open(path, mode)
+
+
+def _iter_csv_blocks(df, workers, chunk_rows, csv_kwargs):
+    """Yield CSV text for consecutive row blocks, in order."""
+    renderers = _column_renderers(df, csv_kwargs)
+    csv_kwargs = dict(csv_kwargs, index=False)
+    header = csv_kwargs.pop("header", True)
+    blocks = [
+        (start, min(start + chunk_rows, len(df)), header if start == 0 else False)
+        for start in range(0, max(len(df), 1), chunk_rows)
+    ]
+
+    if workers == 1 or len(blocks) == 1 or not _CAN_FORK:
+        for block in blocks:
+            yield _format_block(df, csv_kwargs, renderers, *block)
+        return
+
+    # Forked workers inherit the frame; only block bounds and text cross
+    # process boundaries
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+        initargs=(df, csv_kwargs, renderers),
+    ) as pool:
+        # Keep a bounded number of formatted blocks in flight
+        pending = deque()
+        for block in blocks:
+            pending.append(pool.submit(_format_worker_block, *block))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+
+def _format_worker_block(start, stop, header):
+    return _format_block(*_worker_args, start, stop, header)
+
+
+def _format_block(frame, csv_kwargs, renderers, start, stop, header):
+    block = frame.iloc[start:stop]
+    if renderers:
+        block = block.copy(deep=False)
+        for i, render in renderers.items():
+            block.isetitem(i, render(block.iloc[:, i]))
+    return block.to_csv(header=header, **csv_kwargs)
+
+
+def _column_renderers(df, csv_kwargs):
+    """
+    Per-block text renderers for datetime-like columns, keyed by position.
+
+    pandas picks the text format of naive datetimes (date only, seconds
+    or sub-second precision) and timedeltas (whole days or not) from the
+    whole column, so blocks formatted on their own could disagree with a
+    single `to_csv` call. The format is worked out once here from cheap
+    integer checks and every block is rendered with it. Categoricals of
+    datetime-likes have their categories rendered once and each block
+    maps its codes. Other columns (tz-aware, periods, or datetimes with
+    an explicit `date_format`) are formatted value by value already.
+    """
+    date_format = csv_kwargs.get("date_format")
+    renderers = {}
+    for i, dtype in enumerate(df.dtypes):
+        column = df.iloc[:, i]
+        if isinstance(dtype, pd.CategoricalDtype):
+            if dtype.categories.dtype.kind in "mM":
+                text = _render_categories(column, csv_kwargs)
+                renderers[i] = partial(_render_codes, text=text)
+        elif not isinstance(dtype, np.dtype):
+            continue
+        elif dtype.kind == "M" and date_format is None:
+            resolution = _datetime_resolution(column)
+            if resolution is not None:
+                renderers[i] = partial(
+                    _render_datetimes, resolution=resolution
+                )
+        elif dtype.kind == "m" and not _is_whole_days(column):
+            renderers[i] = _render_timedeltas
+    return renderers
+
+
+def _time_values(column):
+    """Non-missing integer values of a datetime64/timedelta64 column."""
+    unit, _ = np.datetime_data(column.dtype)
+    values = column.to_numpy().view("i8")
+    return values[values != _NAT], _PER_SECOND[unit]
+
+
+def _is_whole_days(column):
+    values, per_second = _time_values(column)
+    return bool((values % (86_400 * per_second) == 0).all())
+
+
+def _datetime_resolution(column):
+    """None if every value is at midnight, else "s", "ms", "us" or "ns"."""
+    values, per_second = _time_values(column)
+    if (values % (86_400 * per_second) == 0).all():
+        return None
+    subsecond_ns = values % per_second * (1_000_000_000 // per_second)
+    steps = (("ns", 1_000), ("us", 1_000_000), ("ms", 1_000_000_000))
+    for resolution, step in steps:
+        if (subsecond_ns % step != 0).any():
+            return resolution
+    return "s"
+
+
+def _render_datetimes(values, resolution):
+    if resolution == "s":
+        return values.dt.strftime("%Y-%m-%d %H:%M:%S")
+    text = values.dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+    if resolution == "ms":
+        return text.str[:-3]
+    if resolution == "ns":
+        nanoseconds = values.dt.nanosecond.fillna(0).astype("int64")
+        return text + nanoseconds.astype(str).str.zfill(3)
+    return text
+
+
+def _render_timedeltas(values):
+    # Outside whole days pandas prints each value like str(Timedelta)
+    return values.map(str, na_action="ignore")
+
+
+def _render_categories(column, csv_kwargs):
+    """
+    Text for each category as `to_csv` renders the whole column; the
+    extra last entry (NaN) is for missing codes.
+    """
+    codes = column.cat.codes.to_numpy()
+    n_categories = len(column.cat.categories)
+    used = np.flatnonzero(
+        np.bincount(codes[codes >= 0], minlength=n_categories)
+    )
+    # The format depends only on the values used, whether any are missing
+    # and the date_format/na_rep options (pandas decodes the categories
+    # with na_rep as fill value), so render one row per used category
+    # (plus a missing one) with those options
+    sample_codes = np.append(used, -1) if (codes < 0).any() else used
+    sample = pd.DataFrame({
+        "value": pd.Categorical.from_codes(sample_codes, dtype=column.dtype)
+    })
+    rendered = sample.to_csv(
+        index=False,
+        header=False,
+        date_format=csv_kwargs.get("date_format"),
+        na_rep=csv_kwargs.get("na_rep", ""),
+        quoting=csv.QUOTE_ALL,
+        lineterminator="\n",
+    )
+    text = np.full(n_categories + 1, np.nan, dtype=object)
+    rows = csv.reader(io.StringIO(rendered))
+    text[used] = [row[0] for row in rows][:len(used)]
+    return text
+
+
+def _render_codes(values, text):
+    return pd.Series(
+        text[values.cat.codes.to_numpy()], index=values.index, dtype=object
+    )
@@ -0,0 +1,255 @@
+"""
+Approximate (sampled) execution helpers.
+
+Running the full pipeline on every edit is slow on large data. These
+helpers let a program run on a stratified sample instead:
+- draw a stratified sample by region and category
+- scale sums and counts back up to full-data estimates
+- attach confidence intervals to each estimated aggregate
+
+Exact mode stays the default. Approximate mode is switched on by setting
+the PLAYBOOK_SAMPLE_FRACTION environment variable, e.g.:
+
+    PLAYBOOK_SAMPLE_FRACTION=0.05 python scripts/example_report.py
+
+Approximate outputs go to `*_approx.*` paths (see `output_path`) so a
+development run never replaces the exact artifacts.
+"""
+
+import os
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_FRACTION_ENV = "PLAYBOOK_SAMPLE_FRACTION"
+DEFAULT_STRATA = ["region", "category"]
+
+# Strata up to this size are kept whole (exact); larger ones keep at
+# least this many rows so their sample variance means something
+MIN_STRATUM_SAMPLE = 10
+
+# Flag column set on estimates resting on fewer than MIN_STRATUM_SAMPLE
+# sampled rows of a partially sampled stratum
+LOW_SAMPLE_COL = "low_sample"
+
+# Bookkeeping columns added to every sampled row
+STRATUM_COL = "sample_stratum"
+STRATUM_ROWS_COL = "stratum_rows"
+STRATUM_SAMPLED_COL = "stratum_sampled_rows"
+WEIGHT_COL = "sample_weight"
+SAMPLE_COLUMNS = [STRATUM_COL, STRATUM_ROWS_COL, STRATUM_SAMPLED_COL, WEIGHT_COL]
+
+
+def get_sample_fraction(value=None):
+    """
+    Return the sampling fraction, or None for exact mode.
+
+    Reads PLAYBOOK_SAMPLE_FRACTION when no value is passed. An empty
+    value or a fraction of 1 means exact mode.
+    """
+    if value is None:
+        value = os.environ.get(SAMPLE_FRACTION_ENV, "")
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+    fraction = float(value)
+    if not 0 < fraction <= 1:
+        raise ValueError(
+            f"Sample fraction must be in (0, 1], got {fraction}"
+        )
+    if fraction == 1:
+        return None
+    return fraction
+
+
+def output_path(path, sample_fraction):
+    """Return `path`, or its `_approx` variant in approximate mode."""
+    if sample_fraction is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_approx{ext}"
+
+
+def drop_sample_columns(df):
+    """Remove the sampling bookkeeping columns before writing rows out."""
+    return df.drop(columns=SAMPLE_COLUMNS, errors="ignore")
+
+
+def stratified_sample(df, fraction, strata=DEFAULT_STRATA, random_state=42):
+    """
+    Draw a stratified random sample of `df`.
+
+    Each stratum keeps ceil(fraction * rows) rows, but at least
+    MIN_STRATUM_SAMPLE (or all of them, if smaller) so its variance can
+    be estimated.
+    Strata with missing keys are sampled as their own stratum.
+    """
+    strata = [col for col in strata if col in df.columns]
+    if strata:
+        stratum = df.groupby(
+            strata, observed=True, dropna=False, sort=False
+        ).ngroup().to_numpy()
+    else:
+        stratum = np.zeros(len(df), dtype=int)
+
+    stratum_rows = np.bincount(stratum)[stratum]
+    quota = np.minimum(
+        stratum_rows,
+        np.maximum(
+            MIN_STRATUM_SAMPLE, np.ceil(stratum_rows * fraction)
+        ).astype(int)
+    )
+
+    # Random rank within each stratum; keep the first `quota` rows
+    rng = np.random.default_rng(random_state)
+    rank = (
+        pd.Series(rng.random(len(df)))
+        .groupby(stratum)
+        .rank(method="first")
+        .to_numpy()
+    )
+    keep = rank <= quota
+
+    return df.loc[keep].assign(**{
+        STRATUM_COL: stratum[keep],
+        STRATUM_ROWS_COL: stratum_rows[keep],
+        STRATUM_SAMPLED_COL: quota[keep],
+        WEIGHT_COL: stratum_rows[keep] / quota[keep],
+    })
+
+
+def estimate_aggregates(sample_df, by, confidence=0.95, **named_aggs):
+    """
+    Estimate full-data groupby sums/counts from a stratified sample.
+
+    `named_aggs` follows the named-aggregation style of `.agg()`, e.g.
+    total_sales=("amount", "sum"), order_count=("order_id", "count").
+    Each aggregate gets `<name>_ci_low` / `<name>_ci_high` columns from
+    a Student t interval, with Satterthwaite degrees of freedom across
+    the strata of a group (n - 1 for a single stratum). Counts, and sums
+    of non-negative values, never fall below the total observed in the
+    sample; counts are rounded to integers as in exact mode.
+
+    The LOW_SAMPLE_COL column marks groups holding fewer than
+    MIN_STRATUM_SAMPLE sampled rows of some partially sampled stratum.
+    Their intervals rest on too few rows to trust (a handful of equal
+    values gives a zero-width interval), so read them as rough.
+
+    Groups are treated as domains of the sample: rows dropped after
+    sampling (e.g. by an inner merge) count as zeros in their stratum,
+    so `sample_df` may be a filtered or merged descendant of the sample.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    quantile = 0.5 + confidence / 2
+
+    strata = (
+        sample_df
+        .groupby(STRATUM_COL)[[STRATUM_ROWS_COL, STRATUM_SAMPLED_COL]]
+        .first()
+    )
+
+    cell_rows = (
+        sample_df
+        .groupby(by + [STRATUM_COL], observed=True)
+        .size()
+        .to_frame("k")
+        .join(strata, on=STRATUM_COL)
+    )
+    thin = (
+        (cell_rows["k"] < MIN_STRATUM_SAMPLE)
+        & (cell_rows[STRATUM_SAMPLED_COL] < cell_rows[STRATUM_ROWS_COL])
+    )
+    low_sample = (
+        thin.groupby(level=by, observed=False).any().rename(LOW_SAMPLE_COL)
+    )
+
+    result = None
+    for name, (column, func) in named_aggs.items():
+        if func == "sum":
+            y = pd.to_numeric(sample_df[column], errors="coerce").fillna(0)
+        elif func == "count":
+            y = sample_df[column].notna()
+        else:
+            raise ValueError(
+                f"Only 'sum' and 'count' can be scaled up, got '{func}'"
+            )
+        y = y.astype(float)
+
+        cells = (
+            sample_df[by + [STRATUM_COL]]
+            .assign(y=y, y2=y ** 2)
+            .groupby(by + [STRATUM_COL], observed=True)
+            .agg(s=("y", "sum"), q=("y2", "sum"))
+            .join(strata, on=STRATUM_COL)
+        )
+        rows = cells[STRATUM_ROWS_COL]
+        n = cells[STRATUM_SAMPLED_COL]
+
+        # Stratified estimator of a domain total and its variance
+        cells["estimate"] = rows / n * cells["s"]
+        sample_var = (
+            (cells["q"] - cells["s"] ** 2 / n) / (n - 1)
+        ).where(n > 1, 0.0).clip(lower=0)
+        cells["variance"] = rows ** 2 * (1 - n / rows) * sample_var / n
+        # Satterthwaite terms for the degrees of freedom of a group
+        cells["df_term"] = (
+            cells["variance"] ** 2 / (n - 1)
+        ).where(n > 1, 0.0)
+
+        # observed=False matches the exact-mode groupby on category dtypes
+        totals = (
+            cells
+            .groupby(level=by, observed=False)
+            [["estimate", "variance", "df_term", "s"]]
+            .sum()
+        )
+        dof = (
+            totals["variance"] ** 2 / totals["df_term"]
+        ).where(totals["df_term"] > 0, np.inf)
+        margin = _t_quantile(quantile, dof) * np.sqrt(totals["variance"])
+        ci_low = totals["estimate"] - margin
+        if func == "count" or (y >= 0).all():
+            # The population total is at least what the sample holds
+            ci_low = ci_low.clip(lower=totals["s"])
+        estimates = pd.DataFrame({
+            name: totals["estimate"],
+            f"{name}_ci_low": ci_low,
+            f"{name}_ci_high": totals["estimate"] + margin,
+        })
+        if func == "count":
+            estimates = estimates.round().astype("int64")
+        result = estimates if result is None else result.join(estimates)
+
+    return result.join(low_sample).reset_index()
+
+
+def _t_quantile(p, dof):
+    """
+    Student t quantile for (array-like) degrees of freedom.
+
+    Cornish-Fisher expansion around the normal quantile (Abramowitz &
+    Stegun 26.7.5); within 0.2% of the exact value from 3 degrees of
+    freedom, and equal to the normal quantile for infinite `dof`.
+    """
+    z = NormalDist().inv_cdf(p)
+    v = np.maximum(np.asarray(dof, dtype=float), 1.0)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (
+        79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z
+    ) / 92160
+    return z + g1 / v + g2 / v ** 2 + g3 / v ** 3 + g4 / v ** 4
+
+
+def describe_sample(sample_df, population_rows, fraction, confidence=0.95):
+    """Summary of a sample for printing and verification JSON files."""
+    return {
+        "sample_fraction": fraction,
+        "population_rows": int(population_rows),
+        "sampled_rows": int(len(sample_df)),
+        "strata": int(sample_df[STRATUM_COL].nunique()),
+        "confidence": confidence,
+    }